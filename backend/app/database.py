@@ -1,32 +1,98 @@
 """Database configuration and session management."""
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-# Database URL - SQLite file in the backend directory
+# Database URL - SQLite file in the backend directory. The async engine
+# needs the aiosqlite driver, so bare sqlite:// URLs are upgraded here.
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+if DATABASE_URL.startswith("sqlite://"):
+    DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
 
-engine = create_engine(
+# Async engine so DB calls await instead of blocking the event loop in
+# FastAPI's limited threadpool; the pool settings mirror the previous
+# QueuePool configuration.
+engine = create_async_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False}  # Needed for SQLite
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=10,
+    max_overflow=20,
+    pool_pre_ping=True,
+    pool_recycle=3600,
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+if DATABASE_URL.startswith("sqlite"):
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_conn, _connection_record):
+        """Tune each SQLite connection as it is opened.
+
+        WAL journaling lets readers run concurrently with the writer and,
+        with synchronous=NORMAL, avoids an fsync per INSERT. The remaining
+        pragmas keep temp structures and hot pages in memory.
+        """
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+        cursor.execute("PRAGMA cache_size=-65536")  # 64 MB page cache
+        cursor.close()
+
+SessionLocal = async_sessionmaker(
+    engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
 
 Base = declarative_base()
 
 
-def get_db():
+async def get_db():
     """Dependency for getting database session."""
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-def init_db():
+async def init_db():
     """Create all tables."""
     from . import models  # Import models to register them
-    Base.metadata.create_all(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await _migrate_schema()
+
+
+async def _migrate_schema():
+    """Apply small in-place migrations for databases created before new columns.
+
+    create_all() only creates missing tables, so columns added to existing
+    models have to be patched in by hand (the project has no migration tool).
+    """
+    if not DATABASE_URL.startswith("sqlite"):
+        return
+    async with engine.begin() as conn:
+        result = await conn.exec_driver_sql("PRAGMA table_info(submissions)")
+        columns = [row[1] for row in result]
+        if "risk_bucket" not in columns:
+            await conn.exec_driver_sql("ALTER TABLE submissions ADD COLUMN risk_bucket SMALLINT")
+            await conn.exec_driver_sql(
+                "UPDATE submissions SET risk_bucket = "
+                "CASE WHEN predicted_probability < 0.3 THEN 0 "
+                "WHEN predicted_probability < 0.6 THEN 1 ELSE 2 END"
+            )
+            await conn.exec_driver_sql(
+                "CREATE INDEX IF NOT EXISTS ix_submissions_risk_bucket "
+                "ON submissions (risk_bucket)"
+            )
+        # create_all() only creates missing tables, so indexes added to the
+        # model after a database already exists have to be created here too
+        await conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_submissions_created_at_id "
+            "ON submissions (created_at DESC, id DESC)"
+        )
+        # An earlier revision shipped this index without risk_bucket, which
+        # the stats aggregation groups by; replace it with the covering shape
+        await conn.exec_driver_sql("DROP INDEX IF EXISTS ix_sub_created_prob")
+        await conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_sub_created_bucket_prob "
+            "ON submissions (created_at, risk_bucket, predicted_probability)"
+        )
@@ -1,24 +1,28 @@
 """FastAPI application for Heart Disease Risk Prediction."""
+import base64
 import csv
 import io
 import os
+import time
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI, Depends, Query, Request, HTTPException
+from fastapi import FastAPI, BackgroundTasks, Depends, Query, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, insert, select, tuple_
 
-from .database import get_db, init_db
-from .models import Submission
-from .ml_model import get_model, init_model
+from .database import get_db, init_db, SessionLocal
+from .models import Submission, compute_risk_bucket
+from .ml_model import get_model, init_model, FEATURE_COLUMNS
 from .schemas import (
     PredictionRequest, PredictionResponse, MetricsResponse,
+    BatchPredictionRequest, BatchPredictionResponse,
     SubmissionResponse, SubmissionListResponse, SubmissionStats,
     HealthResponse
 )
@@ -37,15 +41,27 @@ for _dir in _possible_frontend_dirs:
         break
 IS_PRODUCTION = FRONTEND_DIR is not None and FRONTEND_DIR.exists()
 
+# Canned row (the schema example patient) used to warm the predict path
+_WARMUP_SAMPLE = {
+    'age': 55, 'sex': 1, 'cp': 2, 'trtbps': 130, 'chol': 250,
+    'fbs': 0, 'restecg': 1, 'thalachh': 150, 'exng': 0, 'ca': 1
+}
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler - runs on startup and shutdown."""
     # Startup
     print("Initializing database...")
-    init_db()
+    await init_db()
     print("Loading and training ML model...")
     init_model()
+    # Bind the trained singleton once so request handlers read it straight
+    # off app.state instead of re-checking the module global per call
+    app.state.model = get_model()
+    # Warm the prediction path so the first real request doesn't pay for
+    # lazy numpy/scikit-learn initialization
+    app.state.model.predict(_WARMUP_SAMPLE)
     print("Application ready!")
     yield
     # Shutdown
@@ -56,7 +72,8 @@ app = FastAPI(
     title="Heart Disease Risk Prediction API",
     description="Educational API for predicting heart disease risk using machine learning",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware for frontend access
@@ -70,12 +87,12 @@ app.add_middleware(
 
 
 @app.get("/api/health", response_model=HealthResponse)
-async def health_check(db: Session = Depends(get_db)):
+async def health_check(request: Request, db: AsyncSession = Depends(get_db)):
     """Health check endpoint."""
-    model = get_model()
+    model = request.app.state.model
     # Test database connection
     try:
-        db.execute(func.now())
+        await db.execute(select(1))
         db_connected = True
     except Exception:
         db_connected = False
@@ -87,18 +104,27 @@ async def health_check(db: Session = Depends(get_db)):
     )
 
 
+async def _persist_submission(row: dict):
+    """Write one prediction submission outside the request/response path."""
+    async with SessionLocal() as db:
+        db.add(Submission(**row))
+        await db.commit()
+    _invalidate_count_cache()
+
+
 @app.post("/api/predict", response_model=PredictionResponse)
 async def predict(
     request: PredictionRequest,
     req: Request,
-    db: Session = Depends(get_db)
+    background: BackgroundTasks
 ):
     """
     Predict heart disease risk for a patient.
 
-    Saves the submission to the database and returns the prediction.
+    Returns the prediction immediately; the submission row is committed
+    in a background task so the client does not wait on the write.
     """
-    model = get_model()
+    model = req.app.state.model
 
     # Extract features for prediction
     features = {
@@ -117,206 +143,352 @@ async def predict(
     # Get prediction
     result = model.predict(features)
 
-    # Save submission to database
-    submission = Submission(
-        age=request.age,
-        sex=request.sex,
-        cp=request.cp,
-        trtbps=request.trtbps,
-        chol=request.chol,
-        fbs=request.fbs,
-        restecg=request.restecg,
-        thalachh=request.thalachh,
-        exng=request.exng,
-        ca=request.ca,
-        predicted_label=result['predicted_label'],
-        predicted_probability=result['predicted_probability'],
-        note=request.note,
-        user_agent=req.headers.get('user-agent'),
-        ip=req.client.host if req.client else None
-    )
-    db.add(submission)
-    db.commit()
-    db.refresh(submission)
+    # Persist after the response is sent; the trade-off is that the
+    # submission id is not known at response time
+    background.add_task(_persist_submission, {
+        **features,
+        'predicted_label': result['predicted_label'],
+        'predicted_probability': result['predicted_probability'],
+        'risk_bucket': compute_risk_bucket(result['predicted_probability']),
+        'note': request.note,
+        'user_agent': req.headers.get('user-agent'),
+        'ip': req.client.host if req.client else None
+    })
 
     return PredictionResponse(
         predicted_label=result['predicted_label'],
         predicted_probability=result['predicted_probability'],
-        input_echo=result['input_echo'],
-        submission_id=submission.id
+        input_echo=result['input_echo']
     )
 
 
+@app.post("/api/predict/batch", response_model=BatchPredictionResponse)
+async def predict_batch(
+    request: BatchPredictionRequest,
+    req: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Predict heart disease risk for several patients in one request.
+
+    Inference runs as a single vectorized pipeline call and all
+    submissions are written with one bulk INSERT and one commit.
+    """
+    model = req.app.state.model
+
+    features_list = [
+        {column: getattr(item, column) for column in FEATURE_COLUMNS}
+        for item in request.items
+    ]
+
+    results = model.predict_batch(features_list)
+
+    user_agent = req.headers.get('user-agent')
+    ip = req.client.host if req.client else None
+    rows = [
+        {
+            **features,
+            'predicted_label': result['predicted_label'],
+            'predicted_probability': result['predicted_probability'],
+            'risk_bucket': compute_risk_bucket(result['predicted_probability']),
+            'note': item.note,
+            'user_agent': user_agent,
+            'ip': ip,
+        }
+        for item, features, result in zip(request.items, features_list, results)
+    ]
+
+    result = await db.execute(
+        insert(Submission).returning(Submission.id, sort_by_parameter_order=True),
+        rows
+    )
+    submission_ids = result.scalars().all()
+    await db.commit()
+    _invalidate_count_cache()
+
+    return BatchPredictionResponse(results=[
+        PredictionResponse(
+            predicted_label=result['predicted_label'],
+            predicted_probability=result['predicted_probability'],
+            input_echo=result['input_echo'],
+            submission_id=submission_id
+        )
+        for result, submission_id in zip(results, submission_ids)
+    ])
+
+
 @app.get("/api/metrics", response_model=MetricsResponse)
-async def get_metrics():
+async def get_metrics(request: Request):
     """Get model evaluation metrics computed on the test set."""
-    model = get_model()
+    model = request.app.state.model
     metrics = model.get_metrics()
     return MetricsResponse(**metrics)
 
 
 @app.get("/api/distributions")
-async def get_distributions():
+async def get_distributions(request: Request):
     """Get dataset distributions for numeric features (for histogram visualization)."""
-    model = get_model()
-    return model.get_distributions()
+    model = request.app.state.model
+    # Serialized once at train time; skip per-request JSON encoding
+    return Response(content=model.get_distributions_json(), media_type="application/json")
 
 
 @app.get("/api/features")
-async def get_feature_info():
+async def get_feature_info(request: Request):
     """Get information about all features for the form UI."""
-    model = get_model()
+    model = request.app.state.model
     return model.get_feature_info()
 
 
-@app.get("/api/submissions", response_model=SubmissionListResponse)
-async def list_submissions(
-    page: int = Query(1, ge=1, description="Page number"),
-    per_page: int = Query(20, ge=1, le=100, description="Items per page"),
+@lru_cache(maxsize=256)
+def _parse_date(value: str) -> Optional[datetime]:
+    """Parse a YYYY-MM-DD string, memoizing recently seen values."""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def parse_date_range(
     date_from: Optional[str] = Query(None, description="Filter from date (YYYY-MM-DD)"),
     date_to: Optional[str] = Query(None, description="Filter to date (YYYY-MM-DD)"),
-    db: Session = Depends(get_db)
-):
-    """List prediction submissions with pagination and date filtering."""
-    query = db.query(Submission)
-
-    # Apply date filters
+) -> tuple:
+    """Shared dependency validating the date-range filter once for all endpoints."""
+    from_date = to_date = None
     if date_from:
-        try:
-            from_date = datetime.strptime(date_from, "%Y-%m-%d")
-            query = query.filter(Submission.created_at >= from_date)
-        except ValueError:
+        from_date = _parse_date(date_from)
+        if from_date is None:
             raise HTTPException(status_code=400, detail="Invalid date_from format. Use YYYY-MM-DD")
-
     if date_to:
-        try:
-            to_date = datetime.strptime(date_to, "%Y-%m-%d")
-            # Include the entire day
-            to_date = to_date.replace(hour=23, minute=59, second=59)
-            query = query.filter(Submission.created_at <= to_date)
-        except ValueError:
+        to_date = _parse_date(date_to)
+        if to_date is None:
             raise HTTPException(status_code=400, detail="Invalid date_to format. Use YYYY-MM-DD")
+        # Include the entire day
+        to_date = to_date.replace(hour=23, minute=59, second=59)
+    return from_date, to_date
+
+
+# All Submission columns, selected as plain tuples in the read paths so
+# SQLAlchemy skips ORM instance construction for each row.
+_SUBMISSION_COLS = (
+    Submission.id, Submission.created_at, Submission.age, Submission.sex,
+    Submission.cp, Submission.trtbps, Submission.chol, Submission.fbs,
+    Submission.restecg, Submission.thalachh, Submission.exng, Submission.ca,
+    Submission.predicted_label, Submission.predicted_probability,
+    Submission.note, Submission.user_agent, Submission.ip,
+)
+
+# COUNT(*) is a full scan on SQLite, so cache totals per date-filter pair
+# for a short TTL instead of recounting on every page request.
+_count_cache: dict = {}
+_COUNT_CACHE_TTL = 30.0  # seconds
+
+
+async def _cached_count(db: AsyncSession, conditions: list, key: tuple) -> int:
+    """Return the total for a filtered submissions query, cached briefly."""
+    hit = _count_cache.get(key)
+    now = time.monotonic()
+    if hit is not None and now - hit[1] < _COUNT_CACHE_TTL:
+        return hit[0]
+    result = await db.execute(
+        select(func.count()).select_from(Submission).where(*conditions)
+    )
+    total = result.scalar()
+    _count_cache[key] = (total, now)
+    return total
+
+
+def _invalidate_count_cache():
+    """Drop cached totals after a write changes the submissions table."""
+    _count_cache.clear()
+
 
-    # Get total count
-    total = query.count()
+def _encode_cursor(created_at: datetime, submission_id: int) -> str:
+    """Encode a keyset pagination cursor as base64 of 'iso_timestamp|id'."""
+    raw = f"{created_at.isoformat()}|{submission_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
 
-    # Apply pagination
-    offset = (page - 1) * per_page
-    submissions = query.order_by(Submission.created_at.desc()).offset(offset).limit(per_page).all()
+
+def _decode_cursor(cursor: str) -> tuple:
+    """Decode a keyset pagination cursor back to (created_at, id)."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        ts_str, id_str = raw.rsplit("|", 1)
+        return datetime.fromisoformat(ts_str), int(id_str)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@app.get("/api/submissions", response_model=SubmissionListResponse)
+async def list_submissions(
+    page: int = Query(1, ge=1, description="Page number (legacy offset pagination)"),
+    per_page: int = Query(20, ge=1, le=100, description="Items per page"),
+    after: Optional[str] = Query(None, description="Keyset cursor from a previous response's next_cursor"),
+    dates: tuple = Depends(parse_date_range),
+    db: AsyncSession = Depends(get_db)
+):
+    """List prediction submissions with pagination and date filtering.
+
+    Prefer cursor pagination (pass `after` from the previous page's
+    `next_cursor`) — it seeks the composite index directly instead of
+    scanning and discarding offset rows. Page numbers remain supported
+    as a legacy fallback.
+    """
+    from_date, to_date = dates
+    conditions = []
+    if from_date:
+        conditions.append(Submission.created_at >= from_date)
+    if to_date:
+        conditions.append(Submission.created_at <= to_date)
+
+    # Get total count (cached per filter pair to skip the full scan)
+    total = await _cached_count(db, conditions, dates)
+
+    stmt = select(*_SUBMISSION_COLS).where(*conditions).order_by(
+        Submission.created_at.desc(), Submission.id.desc()
+    )
+
+    if after is not None:
+        # Keyset mode: seek past the cursor row, O(limit) instead of O(offset)
+        cursor_ts, cursor_id = _decode_cursor(after)
+        stmt = stmt.where(
+            tuple_(Submission.created_at, Submission.id) < (cursor_ts, cursor_id)
+        )
+    else:
+        # Legacy offset mode
+        stmt = stmt.offset((page - 1) * per_page)
+
+    # Plain row mappings + model_construct skip both ORM hydration and
+    # re-validating values that came straight from the database.
+    rows = (await db.execute(stmt.limit(per_page))).mappings().all()
 
     total_pages = (total + per_page - 1) // per_page if total > 0 else 1
 
+    next_cursor = None
+    if len(rows) == per_page:
+        last = rows[-1]
+        next_cursor = _encode_cursor(last["created_at"], last["id"])
+
     return SubmissionListResponse(
-        submissions=[SubmissionResponse.model_validate(s) for s in submissions],
+        submissions=[SubmissionResponse.model_construct(**row) for row in rows],
         total=total,
         page=page,
         per_page=per_page,
-        total_pages=total_pages
+        total_pages=total_pages,
+        next_cursor=next_cursor
     )
 
 
 @app.get("/api/submissions/stats", response_model=SubmissionStats)
 async def get_submission_stats(
-    date_from: Optional[str] = Query(None, description="Filter from date (YYYY-MM-DD)"),
-    date_to: Optional[str] = Query(None, description="Filter to date (YYYY-MM-DD)"),
-    db: Session = Depends(get_db)
+    dates: tuple = Depends(parse_date_range),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get statistics about submissions."""
-    query = db.query(Submission)
+    """Get statistics about submissions.
 
-    # Apply date filters
-    if date_from:
-        try:
-            from_date = datetime.strptime(date_from, "%Y-%m-%d")
-            query = query.filter(Submission.created_at >= from_date)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date_from format")
-
-    if date_to:
-        try:
-            to_date = datetime.strptime(date_to, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
-            query = query.filter(Submission.created_at <= to_date)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date_to format")
-
-    submissions = query.all()
-    total_count = len(submissions)
-
-    if total_count == 0:
+    Aggregation (count, average, risk buckets) happens in a single SQL
+    query instead of hydrating every row into Python, grouped by the
+    indexed risk_bucket column.
+    """
+    from_date, to_date = dates
+    stmt = select(
+        Submission.risk_bucket,
+        func.count(Submission.id),
+        func.avg(Submission.predicted_probability),
+    ).group_by(Submission.risk_bucket)
+
+    if from_date:
+        stmt = stmt.where(Submission.created_at >= from_date)
+    if to_date:
+        stmt = stmt.where(Submission.created_at <= to_date)
+
+    rows = (await db.execute(stmt)).all()
+    total_count = sum(count for _, count, _ in rows)
+
+    if not total_count:
         return SubmissionStats(
             total_count=0,
             average_risk=0.0,
             risk_distribution={"low": 0, "medium": 0, "high": 0}
         )
 
-    # Calculate average risk
-    avg_risk = sum(s.predicted_probability for s in submissions) / total_count
-
-    # Categorize risk levels
-    low = sum(1 for s in submissions if s.predicted_probability < 0.3)
-    medium = sum(1 for s in submissions if 0.3 <= s.predicted_probability < 0.6)
-    high = sum(1 for s in submissions if s.predicted_probability >= 0.6)
+    avg_risk = sum(count * avg for _, count, avg in rows) / total_count
+    buckets = {bucket: count for bucket, count, _ in rows}
 
     return SubmissionStats(
         total_count=total_count,
         average_risk=round(avg_risk, 4),
-        risk_distribution={"low": low, "medium": medium, "high": high}
+        risk_distribution={
+            "low": buckets.get(0, 0),
+            "medium": buckets.get(1, 0),
+            "high": buckets.get(2, 0),
+        }
     )
 
 
 @app.get("/api/submissions/export")
 async def export_submissions(
-    date_from: Optional[str] = Query(None, description="Filter from date (YYYY-MM-DD)"),
-    date_to: Optional[str] = Query(None, description="Filter to date (YYYY-MM-DD)"),
-    db: Session = Depends(get_db)
+    dates: tuple = Depends(parse_date_range),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Export submissions as CSV file."""
-    query = db.query(Submission)
+    """Export submissions as CSV file.
 
-    # Apply date filters
-    if date_from:
-        try:
-            from_date = datetime.strptime(date_from, "%Y-%m-%d")
-            query = query.filter(Submission.created_at >= from_date)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date_from format")
+    Rows are streamed from a server-side cursor in batches, so memory
+    stays bounded and the first bytes go out before the full result set
+    is read. Selecting plain column tuples also skips ORM hydration.
+    """
+    stmt = select(
+        Submission.id, Submission.created_at, Submission.age,
+        Submission.sex, Submission.cp, Submission.trtbps, Submission.chol,
+        Submission.fbs, Submission.restecg, Submission.thalachh,
+        Submission.exng, Submission.ca, Submission.predicted_label,
+        Submission.predicted_probability, Submission.note
+    )
 
-    if date_to:
-        try:
-            to_date = datetime.strptime(date_to, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
-            query = query.filter(Submission.created_at <= to_date)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date_to format")
-
-    submissions = query.order_by(Submission.created_at.desc()).all()
-
-    # Create CSV in memory
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    # Header row
-    writer.writerow([
-        'id', 'created_at', 'age', 'sex', 'cp', 'trtbps', 'chol', 'fbs',
-        'restecg', 'thalachh', 'exng', 'ca', 'predicted_label',
-        'predicted_probability', 'note'
-    ])
+    from_date, to_date = dates
+    if from_date:
+        stmt = stmt.where(Submission.created_at >= from_date)
+    if to_date:
+        stmt = stmt.where(Submission.created_at <= to_date)
+
+    stmt = stmt.order_by(Submission.created_at.desc())
+    result = await db.stream(stmt, execution_options={"yield_per": 1000})
+
+    async def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
 
-    # Data rows
-    for s in submissions:
+        # Header row
         writer.writerow([
-            s.id, s.created_at.isoformat() if s.created_at else '',
-            s.age, s.sex, s.cp, s.trtbps, s.chol, s.fbs,
-            s.restecg, s.thalachh, s.exng, s.ca,
-            s.predicted_label, s.predicted_probability, s.note or ''
+            'id', 'created_at', 'age', 'sex', 'cp', 'trtbps', 'chol', 'fbs',
+            'restecg', 'thalachh', 'exng', 'ca', 'predicted_label',
+            'predicted_probability', 'note'
         ])
 
-    output.seek(0)
+        # Data rows, flushed whenever the buffer fills a chunk; decoupling
+        # the flush size from the cursor batch size keeps response chunks
+        # consistently sized regardless of row width
+        async for row in result:
+            writer.writerow([
+                row.id, row.created_at.isoformat() if row.created_at else '',
+                row.age, row.sex, row.cp, row.trtbps, row.chol, row.fbs,
+                row.restecg, row.thalachh, row.exng, row.ca,
+                row.predicted_label, row.predicted_probability, row.note or ''
+            ])
+            if buffer.tell() > 65536:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        # Flush whatever remains (always at least the header)
+        if buffer.tell():
+            yield buffer.getvalue()
 
     # Generate filename with timestamp
     filename = f"submissions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
 
     return StreamingResponse(
-        iter([output.getvalue()]),
+        generate_csv(),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -1,9 +1,18 @@
 """SQLAlchemy database models."""
 from datetime import datetime
-from sqlalchemy import Column, Integer, Float, String, DateTime
+from sqlalchemy import Column, Integer, Float, SmallInteger, String, DateTime, Index
 from .database import Base
 
 
+def compute_risk_bucket(probability: float) -> int:
+    """Map a predicted probability to a risk bucket (0=low, 1=medium, 2=high)."""
+    if probability < 0.3:
+        return 0
+    if probability < 0.6:
+        return 1
+    return 2
+
+
 class Submission(Base):
     """Model for storing prediction submissions."""
     __tablename__ = "submissions"
@@ -26,17 +35,31 @@ class Submission(Base):
     # Prediction results
     predicted_label = Column(Integer, nullable=False)
     predicted_probability = Column(Float, nullable=False)
+    # Denormalized bucket (see compute_risk_bucket) so stats can GROUP BY
+    # an indexed integer instead of branching on the probability per row
+    risk_bucket = Column(SmallInteger, index=True)
 
     # Optional metadata
     note = Column(String, nullable=True)
     user_agent = Column(String, nullable=True)
     ip = Column(String, nullable=True)
 
+    # Composite index so keyset pagination can seek directly to a cursor,
+    # plus a covering index so date-filtered stats aggregation (GROUP BY
+    # risk_bucket with count/avg) can be answered from the index without
+    # touching the row heap
+    __table_args__ = (
+        Index("ix_submissions_created_at_id", created_at.desc(), id.desc()),
+        Index("ix_sub_created_bucket_prob", created_at, risk_bucket,
+              predicted_probability),
+    )
+
     def to_dict(self):
         """Convert model to dictionary."""
         return {
             "id": self.id,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
+            # orjson serializes datetimes natively; no isoformat() needed
+            "created_at": self.created_at,
             "age": self.age,
             "sex": self.sex,
             "cp": self.cp,
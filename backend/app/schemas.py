@@ -41,7 +41,20 @@ class PredictionResponse(BaseModel):
     predicted_label: int = Field(..., description="Predicted class (0=No disease, 1=Disease)")
     predicted_probability: float = Field(..., description="Probability of heart disease (0-1)")
     input_echo: Dict[str, int] = Field(..., description="Echo of validated input values")
-    submission_id: int = Field(..., description="ID of the saved submission")
+    submission_id: Optional[int] = Field(
+        None, description="ID of the saved submission (null when persistence happens in the background)"
+    )
+
+
+class BatchPredictionRequest(BaseModel):
+    """Request schema for the batch prediction endpoint."""
+    items: List[PredictionRequest] = Field(..., min_length=1, max_length=100,
+                                           description="Patients to score (1-100)")
+
+
+class BatchPredictionResponse(BaseModel):
+    """Response schema for the batch prediction endpoint."""
+    results: List[PredictionResponse] = Field(..., description="Predictions in request order")
 
 
 class MetricsResponse(BaseModel):
@@ -113,6 +126,7 @@ class SubmissionListResponse(BaseModel):
     page: int
     per_page: int
     total_pages: int
+    next_cursor: Optional[str] = None
 
 
 class SubmissionStats(BaseModel):
@@ -6,224 +6,513 @@ Run this script to verify the API is working correctly.
 Make sure the backend server is running on http://localhost:8000 first.
 """
 
+import asyncio
+import functools
 import json
-import requests
+import os
+import sys
+from operator import itemgetter
+
+import fastjsonschema
+import httpx
+import ijson
+import orjson
+
+try:
+    import uvloop
+except ImportError:  # optional; the stdlib event loop works fine
+    uvloop = None
 
 BASE_URL = "http://localhost:8000"
 
+# Endpoint URLs built once instead of re-joining f-strings per request.
+URL_HEALTH = f"{BASE_URL}/api/health"
+URL_METRICS = f"{BASE_URL}/api/metrics"
+URL_DISTRIBUTIONS = f"{BASE_URL}/api/distributions"
+URL_PREDICT = f"{BASE_URL}/api/predict"
+URL_PREDICT_BATCH = f"{BASE_URL}/api/predict/batch"
+URL_SUBMISSIONS_PAGE = f"{BASE_URL}/api/submissions?page=1&per_page=5"
+
+# Mirror of the server's PredictionRequest constraints, compiled once so
+# payloads can be checked in-process before spending a network round trip
+# on a request the server would reject with 422 anyway.
+_INT_RANGES = {
+    "age": (1, 120),
+    "sex": (0, 1),
+    "cp": (0, 3),
+    "trtbps": (50, 250),
+    "chol": (80, 700),
+    "fbs": (0, 1),
+    "restecg": (0, 2),
+    "thalachh": (50, 250),
+    "exng": (0, 1),
+    "ca": (0, 3),
+}
+
+validate_predict = fastjsonschema.compile({
+    "type": "object",
+    "properties": {
+        **{name: {"type": "integer", "minimum": lo, "maximum": hi}
+           for name, (lo, hi) in _INT_RANGES.items()},
+        "note": {"type": "string", "maxLength": 500},
+    },
+    "required": list(_INT_RANGES),
+})
+
+
+# The test patients share most fields, so they derive from one base
+# template via copy()+update instead of each repeating the full dict.
+BASE_PATIENT = {
+    "age": 45,
+    "sex": 0,  # Female
+    "cp": 0,   # Typical angina
+    "trtbps": 120,
+    "chol": 200,
+    "fbs": 0,
+    "restecg": 0,
+    "thalachh": 160,
+    "exng": 0,
+    "ca": 0,
+}
+
+
+def make_patient(**overrides):
+    """Build a patient payload from the base template plus overrides."""
+    patient = BASE_PATIENT.copy()
+    patient.update(overrides)
+    return patient
+
+
+LOWER_RISK_PATIENT = make_patient(note="Test - lower risk patient")
+
+HIGHER_RISK_PATIENT = make_patient(
+    age=62,
+    sex=1,       # Male
+    cp=3,        # Asymptomatic
+    trtbps=160,
+    chol=300,
+    fbs=1,
+    restecg=2,
+    thalachh=100,
+    exng=1,
+    ca=2,
+    note="Test - higher risk patient",
+)
+
+INVALID_AGE_PATIENT = make_patient(age=150)  # Invalid: > 120
+
+for _patient in (LOWER_RISK_PATIENT, HIGHER_RISK_PATIENT):
+    validate_predict(_patient)
+
+# Both test patients go to the server in a single /api/predict/batch
+# round trip instead of two /api/predict calls. The payloads are fixed,
+# so they are validated and serialized once at import time.
+BATCH_PREDICT_PAYLOAD = orjson.dumps(
+    {"items": [LOWER_RISK_PATIENT, HIGHER_RISK_PATIENT]}
+)
+
+# On-disk ETag cache so repeated runs can send If-None-Match and reuse
+# bodies on 304 instead of re-downloading unchanged responses.
+CACHE_FILE = os.path.expanduser("~/.cache/test_api.json")
+
+
+def _load_etag_cache():
+    try:
+        with open(CACHE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_etag_cache(cache):
+    try:
+        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        with open(CACHE_FILE, "w") as f:
+            json.dump(cache, f)
+    except OSError:
+        pass  # cache is best-effort only
+
+
+_ETAG_CACHE = _load_etag_cache()
+
+
+async def conditional_get_json(session, url):
+    """GET a JSON body, revalidating a cached copy with If-None-Match.
+
+    On 304 the body stored by a previous run is reused, skipping both the
+    transfer and the server-side serialization. Servers that don't emit
+    ETags just take the plain 200 path.
+
+    Returns (status_code, data); data is None on an unexpected status so
+    callers can branch instead of paying for a raised exception.
+    """
+    headers = {}
+    entry = _ETAG_CACHE.get(url)
+    if entry:
+        headers["If-None-Match"] = entry["etag"]
+    response = await session.get(url, headers=headers)
+    status = response.status_code
+    if status == 304 and entry:
+        return status, orjson.loads(entry["body"])
+    if status != 200:
+        return status, None
+    body = response.content
+    etag = response.headers.get("ETag")
+    if etag:
+        _ETAG_CACHE[url] = {"etag": etag, "body": body.decode()}
+    return status, orjson.loads(body)
+
+
+# All output is buffered here and written in one flush at the end of the
+# run, so no test ever blocks on the terminal. Blocks carry an order key
+# because the gathered tests finish in arbitrary order.
+_LOG = []
+
+
+def emit(lines, order=0):
+    """Buffer a block of output lines for the end-of-run flush.
+
+    order fixes the block's position in the flushed report regardless of
+    which test happened to finish first; ties keep insertion order.
+    """
+    _LOG.append((order, "\n".join(lines)))
+
+
+def flush_log():
+    """Write the buffered blocks, in report order, in one stdout write."""
+    _LOG.sort(key=itemgetter(0))
+    sys.stdout.write("\n".join(block for _, block in _LOG) + "\n")
+    _LOG.clear()
+
+
+# Shared output templates, built once, with itemgetter pulling the
+# fields out of the response dicts in a single call.
+METRICS_TEMPLATE = (
+    "   Accuracy:  {0:.2%}\n"
+    "   Precision: {1:.2%}\n"
+    "   Recall:    {2:.2%}\n"
+    "   F1 Score:  {3:.2%}\n"
+    "   Test size: {4} samples"
+)
+_get_metrics = itemgetter("accuracy", "precision", "recall", "f1", "test_size")
+
+DIST_LINE_TEMPLATE = "   - {0}: mean={1:.1f}, std={2:.1f}"
+_get_dist = itemgetter("mean", "std")
+
+PREDICT_TEMPLATE = (
+    "   Predicted label: {0}\n"
+    "   Probability: {1:.2%}\n"
+    "   Submission ID: {2}"
+)
+_get_prediction = itemgetter(
+    "predicted_label", "predicted_probability", "submission_id"
+)
+
+_server_down = False
+
 
-def test_health():
+def endpoint_test(func):
+    """Short-circuit the remaining tests once the server is unreachable.
+
+    Without this, every test after a connection failure burns its own
+    full connect timeout against a server already known to be down.
+    """
+    @functools.wraps(func)
+    async def wrapper(session):
+        global _server_down
+        if _server_down:
+            emit([f"\n   SKIPPED {func.__name__}: server unreachable"], order=90)
+            return False
+        try:
+            return await func(session)
+        except httpx.TransportError:
+            _server_down = True
+            return False
+    return wrapper
+
+
+class _AsyncByteReader:
+    """Minimal async file-like over an httpx byte stream, for ijson."""
+
+    def __init__(self, aiterator):
+        self._aiterator = aiterator
+
+    async def read(self, size=-1):
+        # ijson probes with read(0) to sniff bytes vs str; don't let the
+        # probe swallow the first chunk.
+        if size == 0:
+            return b""
+        try:
+            return await self._aiterator.__anext__()
+        except StopAsyncIteration:
+            return b""
+
+
+async def stream_submissions_page(response):
+    """Incrementally parse a submissions page as it arrives.
+
+    Only the first (latest) submission and the summary counters are kept;
+    the remaining rows are consumed as parse events without ever being
+    materialized, and parsing stops as soon as the counters (which follow
+    the array) have been seen.
+    """
+    meta = {}
+    latest = None
+    current = None
+    reader = _AsyncByteReader(response.aiter_bytes())
+    async for prefix, event, value in ijson.parse(reader, use_float=True):
+        if prefix in ("total", "page", "total_pages"):
+            meta[prefix] = value
+            if len(meta) == 3:
+                break
+        elif prefix == "submissions.item":
+            if event == "start_map" and latest is None:
+                current = {}
+            elif event == "end_map" and current is not None:
+                latest = current
+                current = None
+        elif current is not None and prefix.startswith("submissions.item."):
+            current[prefix.rsplit(".", 1)[1]] = value
+    return meta, latest
+
+
+@endpoint_test
+async def test_health(session):
     """Test the health check endpoint."""
-    print("\n1. Testing /api/health...")
+    lines = ["\n1. Testing /api/health..."]
     try:
-        response = requests.get(f"{BASE_URL}/api/health")
-        response.raise_for_status()
-        data = response.json()
-        print(f"   Status: {data['status']}")
-        print(f"   Model trained: {data['model_trained']}")
-        print(f"   Database connected: {data['database_connected']}")
+        status, data = await conditional_get_json(session, URL_HEALTH)
+        if data is None:
+            lines.append(f"   FAILED: unexpected status {status}")
+            return False
+        lines.append(f"   Status: {data['status']}")
+        lines.append(f"   Model trained: {data['model_trained']}")
+        lines.append(f"   Database connected: {data['database_connected']}")
         return True
+    except httpx.TransportError as e:
+        lines.append(f"   ERROR: cannot reach server: {e}")
+        raise
     except Exception as e:
-        print(f"   ERROR: {e}")
+        lines.append(f"   ERROR: {e}")
         return False
+    finally:
+        # Tests run concurrently, so emit each test's output in one go
+        emit(lines, order=1)
 
 
-def test_metrics():
+@endpoint_test
+async def test_metrics(session):
     """Test the metrics endpoint."""
-    print("\n2. Testing /api/metrics...")
+    lines = ["\n2. Testing /api/metrics..."]
     try:
-        response = requests.get(f"{BASE_URL}/api/metrics")
-        response.raise_for_status()
-        data = response.json()
-        print(f"   Accuracy:  {data['accuracy']:.2%}")
-        print(f"   Precision: {data['precision']:.2%}")
-        print(f"   Recall:    {data['recall']:.2%}")
-        print(f"   F1 Score:  {data['f1']:.2%}")
-        print(f"   Test size: {data['test_size']} samples")
+        status, data = await conditional_get_json(session, URL_METRICS)
+        if data is None:
+            lines.append(f"   FAILED: unexpected status {status}")
+            return False
+        lines.append(METRICS_TEMPLATE.format(*_get_metrics(data)))
         return True
+    except httpx.TransportError as e:
+        lines.append(f"   ERROR: cannot reach server: {e}")
+        raise
     except Exception as e:
-        print(f"   ERROR: {e}")
+        lines.append(f"   ERROR: {e}")
         return False
+    finally:
+        emit(lines, order=2)
 
 
-def test_distributions():
+@endpoint_test
+async def test_distributions(session):
     """Test the distributions endpoint."""
-    print("\n3. Testing /api/distributions...")
+    lines = ["\n3. Testing /api/distributions..."]
     try:
-        response = requests.get(f"{BASE_URL}/api/distributions")
-        response.raise_for_status()
-        data = response.json()
-        print(f"   Available features: {list(data.keys())}")
+        status, data = await conditional_get_json(session, URL_DISTRIBUTIONS)
+        if data is None:
+            lines.append(f"   FAILED: unexpected status {status}")
+            return False
+        lines.append(f"   Available features: {list(data.keys())}")
         for feature, dist in data.items():
-            print(f"   - {feature}: mean={dist['mean']:.1f}, std={dist['std']:.1f}")
-        return True
-    except Exception as e:
-        print(f"   ERROR: {e}")
-        return False
-
-
-def test_predict_lower_risk():
-    """Test prediction with lower-risk patient data."""
-    print("\n4. Testing /api/predict (lower-risk patient)...")
-    try:
-        payload = {
-            "age": 45,
-            "sex": 0,  # Female
-            "cp": 0,   # Typical angina
-            "trtbps": 120,
-            "chol": 200,
-            "fbs": 0,
-            "restecg": 0,
-            "thalachh": 160,
-            "exng": 0,
-            "ca": 0,
-            "note": "Test - lower risk patient"
-        }
-        response = requests.post(
-            f"{BASE_URL}/api/predict",
-            json=payload,
-            headers={"Content-Type": "application/json"}
-        )
-        response.raise_for_status()
-        data = response.json()
-        print(f"   Predicted label: {data['predicted_label']}")
-        print(f"   Probability: {data['predicted_probability']:.2%}")
-        print(f"   Submission ID: {data['submission_id']}")
+            lines.append(DIST_LINE_TEMPLATE.format(feature, *_get_dist(dist)))
         return True
+    except httpx.TransportError as e:
+        lines.append(f"   ERROR: cannot reach server: {e}")
+        raise
     except Exception as e:
-        print(f"   ERROR: {e}")
-        if hasattr(e, 'response') and e.response is not None:
-            print(f"   Response: {e.response.text}")
+        lines.append(f"   ERROR: {e}")
         return False
+    finally:
+        emit(lines, order=3)
 
 
-def test_predict_higher_risk():
-    """Test prediction with higher-risk patient data."""
-    print("\n5. Testing /api/predict (higher-risk patient)...")
+@endpoint_test
+async def test_predict_batch(session):
+    """Score both test patients with one batch prediction request."""
+    lines = ["\n4. Testing /api/predict/batch (both patients)..."]
     try:
-        payload = {
-            "age": 62,
-            "sex": 1,  # Male
-            "cp": 3,   # Asymptomatic
-            "trtbps": 160,
-            "chol": 300,
-            "fbs": 1,
-            "restecg": 2,
-            "thalachh": 100,
-            "exng": 1,
-            "ca": 2,
-            "note": "Test - higher risk patient"
-        }
-        response = requests.post(
-            f"{BASE_URL}/api/predict",
-            json=payload,
-            headers={"Content-Type": "application/json"}
-        )
-        response.raise_for_status()
-        data = response.json()
-        print(f"   Predicted label: {data['predicted_label']}")
-        print(f"   Probability: {data['predicted_probability']:.2%}")
-        print(f"   Submission ID: {data['submission_id']}")
+        response = await session.post(URL_PREDICT_BATCH, content=BATCH_PREDICT_PAYLOAD)
+        if response.status_code != 200:
+            lines.append(f"   FAILED: unexpected status {response.status_code}")
+            return False
+        results = orjson.loads(response.content)["results"]
+        if len(results) != 2:
+            lines.append(f"   FAILED: expected 2 results, got {len(results)}")
+            return False
+        for label, result in zip(("Lower-risk", "Higher-risk"), results):
+            lines.append(f"   {label} patient:")
+            lines.append(PREDICT_TEMPLATE.format(*_get_prediction(result)))
         return True
+    except httpx.TransportError as e:
+        lines.append(f"   ERROR: cannot reach server: {e}")
+        raise
     except Exception as e:
-        print(f"   ERROR: {e}")
-        if hasattr(e, 'response') and e.response is not None:
-            print(f"   Response: {e.response.text}")
+        lines.append(f"   ERROR: {e}")
         return False
+    finally:
+        emit(lines, order=4)
 
 
-def test_submissions():
+@endpoint_test
+async def test_submissions(session):
     """Test the submissions list endpoint."""
-    print("\n6. Testing /api/submissions...")
+    lines = ["\n5. Testing /api/submissions..."]
     try:
-        response = requests.get(f"{BASE_URL}/api/submissions?page=1&per_page=5")
-        response.raise_for_status()
-        data = response.json()
-        print(f"   Total submissions: {data['total']}")
-        print(f"   Page: {data['page']} of {data['total_pages']}")
-        if data['submissions']:
-            print(f"   Latest submission:")
-            latest = data['submissions'][0]
-            print(f"     - ID: {latest['id']}")
-            print(f"     - Created: {latest['created_at']}")
-            print(f"     - Probability: {latest['predicted_probability']:.2%}")
+        # The listing changes on every run, so the ETag cache can't help
+        # here; stream the body instead and bail out early.
+        async with session.stream("GET", URL_SUBMISSIONS_PAGE) as response:
+            if response.status_code != 200:
+                lines.append(f"   FAILED: unexpected status {response.status_code}")
+                return False
+            meta, latest = await stream_submissions_page(response)
+        lines.append(f"   Total submissions: {meta['total']}")
+        lines.append(f"   Page: {meta['page']} of {meta['total_pages']}")
+        if latest:
+            lines.append("   Latest submission:")
+            lines.append(f"     - ID: {latest['id']}")
+            lines.append(f"     - Created: {latest['created_at']}")
+            lines.append(f"     - Probability: {latest['predicted_probability']:.2%}")
         return True
+    except httpx.TransportError as e:
+        lines.append(f"   ERROR: cannot reach server: {e}")
+        raise
     except Exception as e:
-        print(f"   ERROR: {e}")
+        lines.append(f"   ERROR: {e}")
         return False
+    finally:
+        emit(lines, order=5)
 
 
-def test_validation():
+@endpoint_test
+async def test_validation(session):
     """Test input validation."""
-    print("\n7. Testing input validation...")
+    lines = ["\n6. Testing input validation..."]
     try:
-        # Invalid age (out of range)
-        payload = {
-            "age": 150,  # Invalid: > 120
-            "sex": 0,
-            "cp": 0,
-            "trtbps": 120,
-            "chol": 200,
-            "fbs": 0,
-            "restecg": 0,
-            "thalachh": 160,
-            "exng": 0,
-            "ca": 0
-        }
-        response = requests.post(
-            f"{BASE_URL}/api/predict",
-            json=payload,
-            headers={"Content-Type": "application/json"}
+        # The compiled local schema is only a pre-check here (useful for
+        # sweeps of candidate payloads); the server's 422 path is what
+        # this test actually has to exercise, so the POST always goes out.
+        local_agrees = True
+        try:
+            validate_predict(INVALID_AGE_PATIENT)
+            lines.append("   WARNING: local schema accepted invalid age (150)")
+            local_agrees = False
+        except fastjsonschema.JsonSchemaValueException:
+            lines.append("   Local schema rejected invalid age (150)")
+        response = await session.post(
+            URL_PREDICT, content=orjson.dumps(INVALID_AGE_PATIENT)
         )
-        if response.status_code == 422:
-            print("   Validation correctly rejected invalid age (150)")
-            return True
+        status = response.status_code
+        if status == 422:
+            lines.append("   Validation correctly rejected invalid age (150)")
+            return local_agrees
         else:
-            print(f"   WARNING: Expected 422, got {response.status_code}")
+            lines.append(f"   WARNING: Expected 422, got {status}")
             return False
+    except httpx.TransportError as e:
+        lines.append(f"   ERROR: cannot reach server: {e}")
+        raise
     except Exception as e:
-        print(f"   ERROR: {e}")
+        lines.append(f"   ERROR: {e}")
         return False
+    finally:
+        emit(lines, order=6)
 
 
-def main():
-    """Run all tests."""
-    print("=" * 60)
-    print("Heart Disease Risk Prediction API - Test Suite")
-    print("=" * 60)
-    print(f"\nBase URL: {BASE_URL}")
-
-    results = []
-    results.append(("Health Check", test_health()))
-    results.append(("Model Metrics", test_metrics()))
-    results.append(("Distributions", test_distributions()))
-    results.append(("Predict (Lower Risk)", test_predict_lower_risk()))
-    results.append(("Predict (Higher Risk)", test_predict_higher_risk()))
-    results.append(("List Submissions", test_submissions()))
-    results.append(("Input Validation", test_validation()))
+async def run():
+    """Run all tests, overlapping the independent requests."""
+    emit([
+        "=" * 60,
+        "Heart Disease Risk Prediction API - Test Suite",
+        "=" * 60,
+        f"\nBase URL: {BASE_URL}",
+    ])
+
+    # http2=True lets the requests multiplex over a single connection
+    # when the server speaks HTTP/2; against a plain HTTP/1.1 server
+    # httpx falls back transparently and still pools the sockets. The
+    # Connection header is gone since it is forbidden on HTTP/2 and
+    # httpx keeps connections alive by default.
+    async with httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=20),
+        headers={
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            # httpx decompresses transparently
+            "Accept-Encoding": "gzip",
+        }
+    ) as session:
+        # The read-only tests (and the validation POST, which is rejected
+        # before any write) are independent, so their requests can all be
+        # in flight at once. The predict tests mutate the database and run
+        # before the submissions listing that reads their rows back.
+        health, metrics, distributions, validation = await asyncio.gather(
+            test_health(session),
+            test_metrics(session),
+            test_distributions(session),
+            test_validation(session),
+        )
+        # The batch predict writes the rows the submissions listing
+        # reads back, so those two still run in order.
+        batch = await test_predict_batch(session)
+        submissions = await test_submissions(session)
+
+    _save_etag_cache(_ETAG_CACHE)
+
+    results = [
+        ("Health Check", health),
+        ("Model Metrics", metrics),
+        ("Distributions", distributions),
+        ("Batch Predict", batch),
+        ("List Submissions", submissions),
+        ("Input Validation", validation),
+    ]
 
     # Summary
-    print("\n" + "=" * 60)
-    print("TEST SUMMARY")
-    print("=" * 60)
     passed = sum(1 for _, result in results if result)
     total = len(results)
 
-    for name, result in results:
-        status = "PASS" if result else "FAIL"
-        print(f"  {status}: {name}")
-
-    print(f"\nTotal: {passed}/{total} tests passed")
+    summary = ["\n" + "=" * 60, "TEST SUMMARY", "=" * 60]
+    summary.extend(
+        f"  {'PASS' if result else 'FAIL'}: {name}" for name, result in results
+    )
+    summary.append(f"\nTotal: {passed}/{total} tests passed")
 
     if passed == total:
-        print("\nAll tests passed! The API is working correctly.")
+        summary.append("\nAll tests passed! The API is working correctly.")
     else:
-        print("\nSome tests failed. Please check the backend server.")
+        summary.append("\nSome tests failed. Please check the backend server.")
+    emit(summary, order=99)
+    flush_log()
 
     return passed == total
 
 
+def main():
+    """Run all tests."""
+    if uvloop is not None:
+        uvloop.install()
+    return asyncio.run(run())
+
+
 if __name__ == "__main__":
-    import sys
     success = main()
     sys.exit(0 if success else 1)